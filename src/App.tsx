@@ -1,10 +1,12 @@
-import React from 'react';
+import React, { Suspense, lazy } from 'react';
 import { BrowserRouter as Router, Routes, Route } from 'react-router-dom';
 import { Button } from '@/components/ui/button';
 import Predictions from './pages/Predictions';
-import IndicatorBuilder from './pages/IndicatorBuilder';
 import './index.css';
 
+// The indicator builder pulls in recharts; load it only when its route is visited
+const IndicatorBuilder = lazy(() => import('./pages/IndicatorBuilder'));
+
 function App() {
   return (
     <Router>
@@ -25,10 +27,12 @@ function App() {
           </div>
         </nav>
         
-        <Routes>
-          <Route path="/" element={<Predictions />} />
-          <Route path="/indicator-builder" element={<IndicatorBuilder />} />
-        </Routes>
+        <Suspense fallback={null}>
+          <Routes>
+            <Route path="/" element={<Predictions />} />
+            <Route path="/indicator-builder" element={<IndicatorBuilder />} />
+          </Routes>
+        </Suspense>
       </div>
     </Router>
   );
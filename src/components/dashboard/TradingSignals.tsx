@@ -1,7 +1,7 @@
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
-import { Target, TrendingUp, TrendingDown, Brain, Clock } from "lucide-react";
+import { Target, TrendingUp, TrendingDown, Brain, Clock, type LucideIcon } from "lucide-react";
 
 interface TradingSignal {
   id: string;
@@ -15,6 +15,12 @@ interface TradingSignal {
   riskScore: number;
 }
 
+const SIGNAL_STYLES: Record<TradingSignal['type'], { color: string; icon: LucideIcon }> = {
+  buy: { color: "profit", icon: TrendingUp },
+  sell: { color: "loss", icon: TrendingDown },
+  hold: { color: "neutral", icon: Target },
+};
+
 export function TradingSignals() {
   const signals: TradingSignal[] = [
     {
@@ -52,22 +58,6 @@ export function TradingSignals() {
     },
   ];
 
-  const getSignalColor = (type: string) => {
-    switch (type) {
-      case "buy": return "profit";
-      case "sell": return "loss";
-      default: return "neutral";
-    }
-  };
-
-  const getSignalIcon = (type: string) => {
-    switch (type) {
-      case "buy": return TrendingUp;
-      case "sell": return TrendingDown;
-      default: return Target;
-    }
-  };
-
   return (
     <Card className="trading-card">
       <CardHeader>
@@ -79,16 +69,16 @@ export function TradingSignals() {
       <CardContent>
         <div className="space-y-4">
           {signals.map((signal) => {
-            const SignalIcon = getSignalIcon(signal.type);
+            const { color: signalColor, icon: SignalIcon } = SIGNAL_STYLES[signal.type];
             const potentialReturn = ((signal.targetPrice - signal.currentPrice) / signal.currentPrice * 100);
             
             return (
               <div key={signal.id} className="p-3 rounded-lg border border-border bg-muted/20 hover:bg-muted/40 transition-colors">
                 <div className="flex items-start justify-between mb-2">
                   <div className="flex items-center gap-2">
-                    <SignalIcon className={`h-4 w-4 ${getSignalColor(signal.type)}`} />
+                    <SignalIcon className={`h-4 w-4 ${signalColor}`} />
                     <span className="font-semibold">{signal.symbol}</span>
-                    <Badge variant="outline" className={`${getSignalColor(signal.type)} border-current text-xs`}>
+                    <Badge variant="outline" className={`${signalColor} border-current text-xs`}>
                       {signal.type.toUpperCase()}
                     </Badge>
                   </div>
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useMemo } from "react";
 import { supabase } from "@/integrations/supabase/client";
 import { Card } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
@@ -12,33 +12,62 @@ interface MarketIndex {
   changePercent: number;
 }
 
+function isMarketOpenAt(date: Date): boolean {
+  const easternTime = new Date(date.toLocaleString("en-US", {timeZone: "America/New_York"}));
+  const dayOfWeek = easternTime.getDay(); // 0 = Sunday, 6 = Saturday
+  const hours = easternTime.getHours();
+  const minutes = easternTime.getMinutes();
+  const currentTimeInMinutes = hours * 60 + minutes;
+  
+  // Market is open Monday (1) to Friday (5), 9:30 AM to 4:00 PM ET
+  const isWeekday = dayOfWeek >= 1 && dayOfWeek <= 5;
+  const marketOpenTime = 9 * 60 + 30; // 9:30 AM in minutes
+  const marketCloseTime = 16 * 60; // 4:00 PM in minutes
+  
+  const isOpenTime = currentTimeInMinutes >= marketOpenTime && currentTimeInMinutes < marketCloseTime;
+  
+  return isWeekday && isOpenTime;
+}
+
 export default function MarketStatusBar() {
   const [currentTime, setCurrentTime] = useState(new Date());
   const [marketIndices, setMarketIndices] = useState<MarketIndex[]>([]);
-  const [isMarketOpen, setIsMarketOpen] = useState(false);
+
+  // Open/closed only changes on minute boundaries, so re-check once per
+  // minute instead of doing the time zone conversion on every clock tick
+  const minuteBucket = Math.floor(currentTime.getTime() / 60000);
+  const isMarketOpen = useMemo(() => isMarketOpenAt(new Date(minuteBucket * 60000)), [minuteBucket]);
 
   useEffect(() => {
-    // Update time every second
-    const timeInterval = setInterval(() => {
-      setCurrentTime(new Date());
-    }, 1000);
+    // Update time on each wall-clock second boundary; a plain 1s interval
+    // drifts and occasionally shows a second twice or skips one
+    let timeTimeout: ReturnType<typeof setTimeout>;
+    const tick = () => {
+      const now = new Date();
+      setCurrentTime(now);
+      timeTimeout = setTimeout(tick, 1000 - now.getMilliseconds());
+    };
+    timeTimeout = setTimeout(tick, 1000 - new Date().getMilliseconds());
 
     // Fetch market indices data
     fetchMarketIndices();
 
-    // Refresh market data every 5 minutes
-    const dataInterval = setInterval(fetchMarketIndices, 5 * 60 * 1000);
+    // Refresh market data every 5 minutes while the market is open, plus
+    // one last time after the close to pick up closing prices
+    const refreshMs = 5 * 60 * 1000;
+    const dataInterval = setInterval(() => {
+      const now = Date.now();
+      if (isMarketOpenAt(new Date(now)) || isMarketOpenAt(new Date(now - refreshMs))) {
+        fetchMarketIndices();
+      }
+    }, refreshMs);
 
     return () => {
-      clearInterval(timeInterval);
+      clearTimeout(timeTimeout);
       clearInterval(dataInterval);
     };
   }, []);
 
-  useEffect(() => {
-    checkMarketStatus();
-  }, [currentTime]);
-
   const fetchMarketIndices = async () => {
     try {
       const { data, error } = await supabase.functions.invoke('yahoo-finance-data', {
@@ -64,24 +93,6 @@ export default function MarketStatusBar() {
     }
   };
 
-  const checkMarketStatus = () => {
-    const now = new Date();
-    const easternTime = new Date(now.toLocaleString("en-US", {timeZone: "America/New_York"}));
-    const dayOfWeek = easternTime.getDay(); // 0 = Sunday, 6 = Saturday
-    const hours = easternTime.getHours();
-    const minutes = easternTime.getMinutes();
-    const currentTimeInMinutes = hours * 60 + minutes;
-    
-    // Market is open Monday (1) to Friday (5), 9:30 AM to 4:00 PM ET
-    const isWeekday = dayOfWeek >= 1 && dayOfWeek <= 5;
-    const marketOpenTime = 9 * 60 + 30; // 9:30 AM in minutes
-    const marketCloseTime = 16 * 60; // 4:00 PM in minutes
-    
-    const isOpenTime = currentTimeInMinutes >= marketOpenTime && currentTimeInMinutes < marketCloseTime;
-    
-    setIsMarketOpen(isWeekday && isOpenTime);
-  };
-
   const formatTime = (date: Date) => {
     return date.toLocaleTimeString('en-US', {
       timeZone: 'America/New_York',
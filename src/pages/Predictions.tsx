@@ -19,6 +19,9 @@ interface Prediction {
   technical_indicators: any;
 }
 
+// Only the columns the page renders (skips prediction_date/model_version)
+const PREDICTION_COLUMNS = 'id, symbol, predicted_price, confidence_score, signal_type, created_at, expires_at, technical_indicators';
+
 interface CurrentQuote {
   symbol: string;
   price: number;
@@ -45,7 +48,7 @@ export default function Predictions() {
     // First try to fetch existing predictions
     const { data: existingPredictions } = await supabase
       .from('ai_predictions')
-      .select('*')
+      .select(PREDICTION_COLUMNS)
       .order('created_at', { ascending: false })
       .limit(10);
 
@@ -78,7 +81,8 @@ export default function Predictions() {
     
     console.log('Generating predictions for trending stocks:', todaysTrending);
     
-    for (const symbol of todaysTrending) {
+    // Analyses are independent; run them concurrently rather than one by one
+    await Promise.all(todaysTrending.map(async (symbol) => {
       try {
         await supabase.functions.invoke('ai-trading-analysis', {
           body: {
@@ -89,7 +93,7 @@ export default function Predictions() {
       } catch (error) {
         console.error(`Error analyzing trending stock ${symbol}:`, error);
       }
-    }
+    }));
     
     // Fetch the newly created predictions
     await fetchPredictions();
@@ -99,7 +103,7 @@ export default function Predictions() {
     try {
       const { data, error } = await supabase
         .from('ai_predictions')
-        .select('*')
+        .select(PREDICTION_COLUMNS)
         .order('created_at', { ascending: false })
         .limit(10);
 
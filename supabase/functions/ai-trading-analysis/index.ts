@@ -10,11 +10,24 @@ const corsHeaders = {
   'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 };
 
+const jsonHeaders = { ...corsHeaders, 'Content-Type': 'application/json' };
+
 const supabase = createClient(
   Deno.env.get('SUPABASE_URL') ?? '',
-  Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? ''
+  Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? '',
+  {
+    auth: { persistSession: false, autoRefreshToken: false },
+  }
 );
 
+// Per-step progress logs are noisy at request volume; enable them with
+// ANALYSIS_VERBOSE_LOGS=true when debugging. Errors are always logged.
+const VERBOSE_LOGS = Deno.env.get('ANALYSIS_VERBOSE_LOGS') === 'true';
+
+function logDebug(...args: unknown[]) {
+  if (VERBOSE_LOGS) console.log(...args);
+}
+
 serve(async (req) => {
   if (req.method === 'OPTIONS') {
     return new Response(null, { headers: corsHeaders });
@@ -37,165 +50,199 @@ serve(async (req) => {
     console.error('Error in ai-trading-analysis function:', error);
     return new Response(
       JSON.stringify({ error: error.message }),
-      { headers: { ...corsHeaders, 'Content-Type': 'application/json' }, status: 500 }
+      { headers: jsonHeaders, status: 500 }
     );
   }
 });
 
 async function analyzeStock(symbol: string) {
-  console.log(`🔍 Starting advanced AI analysis for ${symbol}`);
-  
   try {
-    // Get current quote and validate symbol
-    const { data: currentData, error: currentError } = await supabase.functions.invoke('yahoo-finance-data', {
-      body: { action: 'current_quotes', symbols: [symbol] }
-    });
-
-    if (currentError || !currentData?.quotes?.[0]) {
-      throw new Error(`Invalid or unknown stock symbol: ${symbol}`);
-    }
-
-    const currentPrice = currentData.quotes[0].price;
-    const currentVolume = currentData.quotes[0].volume || 0;
-    const dailyChange = currentData.quotes[0].changePercent || 0;
-    
-    console.log(`📊 Current data - Price: $${currentPrice}, Volume: ${currentVolume}, Change: ${dailyChange}%`);
-
-    // Multi-timeframe analysis: Get 6 months of daily data and 1 month of hourly data
-    const [dailyData, weeklyData] = await Promise.all([
-      supabase.functions.invoke('yahoo-finance-data', {
-        body: { action: 'historical_data', symbols: [symbol], period: '6mo', interval: '1d' }
-      }),
-      supabase.functions.invoke('yahoo-finance-data', {
-        body: { action: 'historical_data', symbols: [symbol], period: '3mo', interval: '1wk' }
-      })
-    ]);
-
-    if (!dailyData.data?.data || dailyData.data.data.length < 50) {
-      return createSimplifiedPrediction(symbol, currentPrice);
-    }
-
-    // Extract price and volume data
-    const dailyPrices = dailyData.data.data.map((item: any) => item.close).filter((p: number) => p && !isNaN(p));
-    const dailyVolumes = dailyData.data.data.map((item: any) => item.volume).filter((v: number) => v && !isNaN(v));
-    const dailyHighs = dailyData.data.data.map((item: any) => item.high).filter((p: number) => p && !isNaN(p));
-    const dailyLows = dailyData.data.data.map((item: any) => item.low).filter((p: number) => p && !isNaN(p));
-    
-    const weeklyPrices = weeklyData.data?.data ? 
-      weeklyData.data.data.map((item: any) => item.close).filter((p: number) => p && !isNaN(p)) : [];
-
-    console.log(`📈 Data points - Daily: ${dailyPrices.length}, Weekly: ${weeklyPrices.length}`);
-
-    // Advanced Technical Analysis
-    const technicalIndicators = await calculateAdvancedIndicators(
-      dailyPrices, 
-      dailyVolumes, 
-      dailyHighs, 
-      dailyLows, 
-      weeklyPrices,
-      currentPrice,
-      currentVolume
-    );
-
-    // Pattern Recognition
-    const patterns = detectPricePatterns(dailyPrices, dailyHighs, dailyLows);
-    
-    // Market Sentiment Analysis
-    const sentiment = analyzeMarketSentiment(technicalIndicators, patterns, dailyChange);
-    
-    // Multi-factor AI prediction with ensemble methods
-    const prediction = generateAdvancedPrediction(technicalIndicators, patterns, sentiment, symbol);
-
-    // Enhanced risk assessment
-    const riskMetrics = calculateRiskMetrics(dailyPrices, prediction, technicalIndicators);
-
-    // Store enhanced prediction
-    const { error: insertError } = await supabase.from('ai_predictions').insert({
-      symbol,
-      prediction_date: new Date().toISOString().split('T')[0],
-      predicted_price: prediction.targetPrice,
-      confidence_score: prediction.confidence,
-      signal_type: prediction.signal,
-      model_version: 'v3.0-advanced',
-      technical_indicators: {
-        // Core indicators
-        rsi: technicalIndicators.rsi,
-        macd: technicalIndicators.macd,
-        macdSignal: technicalIndicators.macdSignal,
-        sma20: technicalIndicators.sma20,
-        sma50: technicalIndicators.sma50,
-        sma200: technicalIndicators.sma200,
-        
-        // Advanced indicators
-        stochastic: technicalIndicators.stochastic,
-        williams: technicalIndicators.williamsR,
-        atr: technicalIndicators.atr,
-        adx: technicalIndicators.adx,
-        cci: technicalIndicators.cci,
-        
-        // Bollinger Bands
-        bbUpper: technicalIndicators.bollingerUpper,
-        bbLower: technicalIndicators.bollingerLower,
-        bbPosition: technicalIndicators.bollingerPosition,
-        
-        // Volume analysis
-        volumeRatio: technicalIndicators.volumeRatio,
-        volumeTrend: technicalIndicators.volumeTrend,
-        obv: technicalIndicators.obv,
-        
-        // Market structure
-        support: technicalIndicators.support,
-        resistance: technicalIndicators.resistance,
-        trend: technicalIndicators.trend,
-        
-        // Pattern recognition
-        patterns: patterns,
-        
-        // Risk metrics
-        volatility: riskMetrics.volatility,
-        sharpeRatio: riskMetrics.sharpeRatio,
-        maxDrawdown: riskMetrics.maxDrawdown,
-        
-        // Prediction metadata
-        modelEnsemble: prediction.modelScores,
-        timeframeAnalysis: prediction.timeframeScores,
-        marketRegime: sentiment.regime,
-        
-        currentPrice,
-        analysisTimestamp: new Date().toISOString()
-      },
-      expires_at: new Date(Date.now() + 24 * 60 * 60 * 1000).toISOString()
-    });
+    const { predictionRow, result } = await runAnalysis(symbol);
+    const { error: insertError } = await supabase.from('ai_predictions').insert(predictionRow);
 
     if (insertError) {
-      console.error('❌ Error storing prediction:', insertError);
-      throw new Error(`Failed to store prediction: ${insertError.message}`);
+      // Simplified predictions are best-effort: log and still return them
+      if (!('technicalIndicators' in result)) {
+        console.error('Error storing simplified prediction:', insertError);
+      } else {
+        console.error('❌ Error storing prediction:', insertError);
+        throw new Error(`Failed to store prediction: ${insertError.message}`);
+      }
+    } else if ('technicalIndicators' in result) {
+      logAnalysisCompleted(symbol, result.prediction.signal, result.prediction.confidence);
     }
 
-    console.log(`✅ Advanced analysis completed for ${symbol} - Signal: ${prediction.signal}, Confidence: ${Math.round(prediction.confidence * 100)}%`);
-    
     return new Response(
-      JSON.stringify({ 
-        symbol, 
-        prediction: {
-          ...prediction,
-          riskMetrics,
-          patterns,
-          sentiment: sentiment.score
-        },
-        technicalIndicators,
-        message: 'Advanced AI analysis completed successfully'
-      }),
-      { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+      JSON.stringify(result),
+      { headers: jsonHeaders }
     );
-    
   } catch (error) {
     console.error(`❌ Error in analyzeStock for ${symbol}:`, error);
     throw error;
   }
 }
 
-async function createSimplifiedPrediction(symbol: string, currentPrice: number) {
+function logAnalysisCompleted(symbol: string, signal: string, confidence: number) {
+  console.log(`✅ Advanced analysis completed for ${symbol} - Signal: ${signal}, Confidence: ${Math.round(confidence * 100)}%`);
+}
+
+// Runs the full analysis without touching the database, returning the
+// ai_predictions row to store and the response payload. `quote` lets batch
+// callers pass a quote they already fetched for the symbol.
+async function runAnalysis(symbol: string, quote?: any) {
+  logDebug(`🔍 Starting advanced AI analysis for ${symbol}`);
+  
+  // Current quote plus 6 months of daily and 3 months of weekly bars; the
+  // three lookups are independent, so fetch them concurrently
+  const [
+    { data: currentData, error: currentError },
+    dailyData,
+    weeklyData,
+  ] = await Promise.all([
+    quote ? { data: { quotes: [quote] }, error: null } : supabase.functions.invoke('yahoo-finance-data', {
+      body: { action: 'current_quotes', symbols: [symbol] }
+    }),
+    supabase.functions.invoke('yahoo-finance-data', {
+      body: { action: 'historical_data', symbols: [symbol], period: '6mo', interval: '1d' }
+    }),
+    supabase.functions.invoke('yahoo-finance-data', {
+      body: { action: 'historical_data', symbols: [symbol], period: '3mo', interval: '1wk' }
+    })
+  ]);
+
+  // Validate symbol
+  if (currentError || !currentData?.quotes?.[0]) {
+    throw new Error(`Invalid or unknown stock symbol: ${symbol}`);
+  }
+
+  const currentPrice = currentData.quotes[0].price;
+  const currentVolume = currentData.quotes[0].volume || 0;
+  const dailyChange = currentData.quotes[0].changePercent || 0;
+  
+  logDebug(`📊 Current data - Price: $${currentPrice}, Volume: ${currentVolume}, Change: ${dailyChange}%`);
+
+  if (!dailyData.data?.data || dailyData.data.data.length < 50) {
+    return buildSimplifiedPrediction(symbol, currentPrice);
+  }
+
+  // Extract price and volume data in one pass so the series stay index-aligned
+  const dailyPrices: number[] = [];
+  const dailyVolumes: number[] = [];
+  const dailyHighs: number[] = [];
+  const dailyLows: number[] = [];
+  for (const item of dailyData.data.data) {
+    if (!item.close || !item.high || !item.low) continue;
+    dailyPrices.push(item.close);
+    dailyHighs.push(item.high);
+    dailyLows.push(item.low);
+    dailyVolumes.push(item.volume || 0);
+  }
+  
+  const weeklyPrices = weeklyData.data?.data ? 
+    weeklyData.data.data.map((item: any) => item.close).filter((p: number) => p && !isNaN(p)) : [];
+
+  logDebug(`📈 Data points - Daily: ${dailyPrices.length}, Weekly: ${weeklyPrices.length}`);
+
+  // Advanced Technical Analysis
+  const technicalIndicators = await calculateAdvancedIndicators(
+    dailyPrices, 
+    dailyVolumes, 
+    dailyHighs, 
+    dailyLows, 
+    weeklyPrices,
+    currentPrice,
+    currentVolume
+  );
+
+  // Pattern Recognition
+  const patterns = detectPricePatterns(dailyPrices, dailyHighs, dailyLows);
+  
+  // Market Sentiment Analysis
+  const sentiment = analyzeMarketSentiment(technicalIndicators, patterns, dailyChange);
+  
+  // Multi-factor AI prediction with ensemble methods
+  const prediction = generateAdvancedPrediction(technicalIndicators, patterns, sentiment, symbol);
+
+  // Enhanced risk assessment
+  const riskMetrics = calculateRiskMetrics(dailyPrices, prediction, technicalIndicators);
+
+  // Enhanced prediction row
+  const now = new Date();
+  const analysisTimestamp = now.toISOString();
+  const predictionRow = {
+    symbol,
+    prediction_date: analysisTimestamp.split('T')[0],
+    predicted_price: prediction.targetPrice,
+    confidence_score: prediction.confidence,
+    signal_type: prediction.signal,
+    model_version: 'v3.0-advanced',
+    technical_indicators: {
+      // Core indicators
+      rsi: technicalIndicators.rsi,
+      macd: technicalIndicators.macd,
+      macdSignal: technicalIndicators.macdSignal,
+      sma20: technicalIndicators.sma20,
+      sma50: technicalIndicators.sma50,
+      sma200: technicalIndicators.sma200,
+      
+      // Advanced indicators
+      stochastic: technicalIndicators.stochastic,
+      williams: technicalIndicators.williamsR,
+      atr: technicalIndicators.atr,
+      adx: technicalIndicators.adx,
+      cci: technicalIndicators.cci,
+      
+      // Bollinger Bands
+      bbUpper: technicalIndicators.bollingerUpper,
+      bbLower: technicalIndicators.bollingerLower,
+      bbPosition: technicalIndicators.bollingerPosition,
+      
+      // Volume analysis
+      volumeRatio: technicalIndicators.volumeRatio,
+      volumeTrend: technicalIndicators.volumeTrend,
+      obv: technicalIndicators.obv,
+      
+      // Market structure
+      support: technicalIndicators.support,
+      resistance: technicalIndicators.resistance,
+      trend: technicalIndicators.trend,
+      
+      // Pattern recognition
+      patterns: patterns,
+      
+      // Risk metrics
+      volatility: riskMetrics.volatility,
+      sharpeRatio: riskMetrics.sharpeRatio,
+      maxDrawdown: riskMetrics.maxDrawdown,
+      
+      // Prediction metadata
+      modelEnsemble: prediction.modelScores,
+      timeframeAnalysis: prediction.timeframeScores,
+      marketRegime: sentiment.regime,
+      
+      currentPrice,
+      analysisTimestamp
+    },
+    expires_at: new Date(now.getTime() + 24 * 60 * 60 * 1000).toISOString()
+  };
+
+  return {
+    predictionRow,
+    result: {
+      symbol, 
+      prediction: {
+        ...prediction,
+        riskMetrics,
+        patterns,
+        sentiment: sentiment.score
+      },
+      technicalIndicators,
+      message: 'Advanced AI analysis completed successfully'
+    }
+  };
+}
+
+function buildSimplifiedPrediction(symbol: string, currentPrice: number) {
   console.log('⚠️ Using simplified analysis due to insufficient historical data');
   
   const simplePrediction = {
@@ -205,27 +252,26 @@ async function createSimplifiedPrediction(symbol: string, currentPrice: number)
     reasoning: 'Limited historical data - using market-neutral approach'
   };
 
-  const { error: insertError } = await supabase.from('ai_predictions').insert({
+  const now = new Date();
+  const predictionRow = {
     symbol,
     predicted_price: simplePrediction.targetPrice,
     confidence_score: simplePrediction.confidence,
     signal_type: simplePrediction.signal,
     technical_indicators: { currentPrice, note: 'Simplified analysis - insufficient data' },
-    prediction_date: new Date().toISOString().split('T')[0],
-    expires_at: new Date(Date.now() + 24 * 60 * 60 * 1000).toISOString(),
+    prediction_date: now.toISOString().split('T')[0],
+    expires_at: new Date(now.getTime() + 24 * 60 * 60 * 1000).toISOString(),
     model_version: 'v3.0-simple'
-  });
-
-  if (insertError) console.error('Error storing simplified prediction:', insertError);
+  };
 
-  return new Response(
-    JSON.stringify({ 
+  return {
+    predictionRow,
+    result: {
       symbol, 
       prediction: simplePrediction,
       message: 'Simplified analysis - insufficient historical data for advanced modeling'
-    }),
-    { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-  );
+    }
+  };
 }
 
 // =================== ADVANCED TECHNICAL INDICATORS ===================
@@ -234,19 +280,17 @@ async function calculateAdvancedIndicators(dailyPrices: number[], dailyVolumes:
   dailyHighs: number[], dailyLows: number[], weeklyPrices: number[], 
   currentPrice: number, currentVolume: number) {
   
-  console.log('🔧 Calculating advanced technical indicators...');
+  logDebug('🔧 Calculating advanced technical indicators...');
   
   // Core indicators
   const rsi = calculateRSI(dailyPrices, 14);
   const rsi_fast = calculateRSI(dailyPrices, 9);
-  const { macd, signal: macdSignal, histogram } = calculateMACD(dailyPrices);
+  const { macd, signal: macdSignal, histogram, fastEMA: ema12, slowEMA: ema26 } = calculateMACD(dailyPrices);
   
   // Moving averages (multiple timeframes)
   const sma20 = calculateSMA(dailyPrices, 20);
   const sma50 = calculateSMA(dailyPrices, 50);
   const sma200 = calculateSMA(dailyPrices, 200);
-  const ema12 = calculateEMA(dailyPrices, 12);
-  const ema26 = calculateEMA(dailyPrices, 26);
   
   // Bollinger Bands
   const bollinger = calculateBollingerBands(dailyPrices, 20, 2);
@@ -332,21 +376,27 @@ async function calculateAdvancedIndicators(dailyPrices: number[], dailyVolumes:
 function calculateRSI(prices: number[], period: number = 14): number[] {
   if (prices.length < period + 1) return [50];
   
-  const gains: number[] = [];
-  const losses: number[] = [];
+  // Rolling gain/loss sums over the last `period` price changes
+  const rsi: number[] = [];
+  let gainSum = 0;
+  let lossSum = 0;
 
   for (let i = 1; i < prices.length; i++) {
     const change = prices[i] - prices[i - 1];
-    gains.push(change > 0 ? change : 0);
-    losses.push(change < 0 ? Math.abs(change) : 0);
-  }
+    if (change > 0) gainSum += change;
+    else lossSum -= change;
 
-  const rsi: number[] = [];
-  for (let i = period - 1; i < gains.length; i++) {
-    const avgGain = gains.slice(i - period + 1, i + 1).reduce((a, b) => a + b, 0) / period;
-    const avgLoss = losses.slice(i - period + 1, i + 1).reduce((a, b) => a + b, 0) / period;
+    if (i > period) {
+      const dropped = prices[i - period] - prices[i - period - 1];
+      if (dropped > 0) gainSum -= dropped;
+      else lossSum += dropped;
+    }
+    if (i < period) continue;
+
+    const avgGain = gainSum / period;
+    const avgLoss = lossSum / period;
     
-    if (avgLoss === 0) {
+    if (avgLoss <= 0) {
       rsi.push(100);
     } else {
       const rs = avgGain / avgLoss;
@@ -358,14 +408,15 @@ function calculateRSI(prices: number[], period: number = 14): number[] {
 }
 
 function calculateMACD(prices: number[], fastPeriod = 12, slowPeriod = 26, signalPeriod = 9) {
-  const ema12 = calculateEMA(prices, fastPeriod);
-  const ema26 = calculateEMA(prices, slowPeriod);
+  const fastEMA = calculateEMA(prices, fastPeriod);
+  const slowEMA = calculateEMA(prices, slowPeriod);
   
-  const macd = ema12.map((value, index) => value - ema26[index]);
+  const macd = fastEMA.map((value, index) => value - slowEMA[index]);
   const signal = calculateEMA(macd, signalPeriod);
   const histogram = macd.map((value, index) => value - (signal[index] || 0));
 
-  return { macd, signal, histogram };
+  // The underlying EMAs are returned too so callers don't recompute them
+  return { macd, signal, histogram, fastEMA, slowEMA };
 }
 
 function calculateEMA(prices: number[], period: number): number[] {
@@ -384,27 +435,38 @@ function calculateEMA(prices: number[], period: number): number[] {
 function calculateSMA(prices: number[], period: number): number[] {
   if (prices.length < period) return [];
   
-  const sma = [];
-  for (let i = period - 1; i < prices.length; i++) {
-    const sum = prices.slice(i - period + 1, i + 1).reduce((a, b) => a + b, 0);
-    sma.push(sum / period);
+  // Rolling sum: add the price entering the window, subtract the one leaving it
+  const sma: number[] = [];
+  let sum = 0;
+  for (let i = 0; i < prices.length; i++) {
+    sum += prices[i];
+    if (i >= period) sum -= prices[i - period];
+    if (i >= period - 1) sma.push(sum / period);
   }
   return sma;
 }
 
 function calculateBollingerBands(prices: number[], period: number, deviation: number) {
-  const sma = calculateSMA(prices, period);
-  const upperBand = [];
-  const lowerBand = [];
-
-  for (let i = period - 1; i < prices.length; i++) {
-    const slice = prices.slice(i - period + 1, i + 1);
-    const mean = slice.reduce((a, b) => a + b, 0) / period;
-    const variance = slice.reduce((a, b) => a + Math.pow(b - mean, 2), 0) / period;
-    const stdDev = Math.sqrt(variance);
-
-    upperBand.push(sma[i - period + 1] + (deviation * stdDev));
-    lowerBand.push(sma[i - period + 1] - (deviation * stdDev));
+  const upperBand: number[] = [];
+  const lowerBand: number[] = [];
+
+  // Single pass with running sum and sum of squares for mean and variance
+  let sum = 0;
+  let sumSq = 0;
+  for (let i = 0; i < prices.length; i++) {
+    sum += prices[i];
+    sumSq += prices[i] * prices[i];
+    if (i >= period) {
+      sum -= prices[i - period];
+      sumSq -= prices[i - period] * prices[i - period];
+    }
+    if (i < period - 1) continue;
+
+    const mean = sum / period;
+    const stdDev = Math.sqrt(Math.max(0, sumSq / period - mean * mean));
+
+    upperBand.push(mean + (deviation * stdDev));
+    lowerBand.push(mean - (deviation * stdDev));
   }
 
   return { upperBand, lowerBand };
@@ -415,10 +477,15 @@ function calculateBollingerBands(prices: number[], period: number, deviation: nu
 function calculateStochastic(highs: number[], lows: number[], closes: number[], period: number = 14): number[] {
   if (highs.length < period) return [50];
   
-  const stochastic = [];
+  // Scan each window in place rather than slicing and spreading it
+  const stochastic: number[] = [];
   for (let i = period - 1; i < highs.length; i++) {
-    const highestHigh = Math.max(...highs.slice(i - period + 1, i + 1));
-    const lowestLow = Math.min(...lows.slice(i - period + 1, i + 1));
+    let highestHigh = highs[i];
+    let lowestLow = lows[i];
+    for (let j = i - period + 1; j < i; j++) {
+      if (highs[j] > highestHigh) highestHigh = highs[j];
+      if (lows[j] < lowestLow) lowestLow = lows[j];
+    }
     const currentClose = closes[i];
     
     const k = ((currentClose - lowestLow) / (highestHigh - lowestLow)) * 100;
@@ -431,10 +498,14 @@ function calculateStochastic(highs: number[], lows: number[], closes: number[],
 function calculateWilliamsR(highs: number[], lows: number[], closes: number[], period: number = 14): number[] {
   if (highs.length < period) return [-50];
   
-  const williamsR = [];
+  const williamsR: number[] = [];
   for (let i = period - 1; i < highs.length; i++) {
-    const highestHigh = Math.max(...highs.slice(i - period + 1, i + 1));
-    const lowestLow = Math.min(...lows.slice(i - period + 1, i + 1));
+    let highestHigh = highs[i];
+    let lowestLow = lows[i];
+    for (let j = i - period + 1; j < i; j++) {
+      if (highs[j] > highestHigh) highestHigh = highs[j];
+      if (lows[j] < lowestLow) lowestLow = lows[j];
+    }
     const currentClose = closes[i];
     
     const wr = ((highestHigh - currentClose) / (highestHigh - lowestLow)) * -100;
@@ -447,17 +518,27 @@ function calculateWilliamsR(highs: number[], lows: number[], closes: number[], p
 function calculateCCI(highs: number[], lows: number[], closes: number[], period: number = 20): number[] {
   if (highs.length < period) return [0];
   
-  const cci = [];
-  for (let i = period - 1; i < highs.length; i++) {
-    const typicalPrices = [];
+  // Typical prices computed once; rolling sum for their moving average
+  const typicalPrices: number[] = [];
+  for (let i = 0; i < highs.length; i++) {
+    typicalPrices.push((highs[i] + lows[i] + closes[i]) / 3);
+  }
+
+  const cci: number[] = [];
+  let tpSum = 0;
+  for (let i = 0; i < typicalPrices.length; i++) {
+    tpSum += typicalPrices[i];
+    if (i >= period) tpSum -= typicalPrices[i - period];
+    if (i < period - 1) continue;
+
+    const smaTP = tpSum / period;
+    let deviationSum = 0;
     for (let j = i - period + 1; j <= i; j++) {
-      typicalPrices.push((highs[j] + lows[j] + closes[j]) / 3);
+      deviationSum += Math.abs(typicalPrices[j] - smaTP);
     }
+    const meanDeviation = deviationSum / period;
     
-    const smaTP = typicalPrices.reduce((a, b) => a + b, 0) / period;
-    const meanDeviation = typicalPrices.reduce((sum, tp) => sum + Math.abs(tp - smaTP), 0) / period;
-    
-    const currentTP = (highs[i] + lows[i] + closes[i]) / 3;
+    const currentTP = typicalPrices[i];
     const cciValue = meanDeviation !== 0 ? (currentTP - smaTP) / (0.015 * meanDeviation) : 0;
     
     cci.push(cciValue);
@@ -486,8 +567,8 @@ function calculateADX(highs: number[], lows: number[], closes: number[], period:
   if (highs.length < period + 1) return [25];
   
   // Simplified ADX calculation
-  const dmPlus = [];
-  const dmMinus = [];
+  const dmPlus: number[] = [];
+  const dmMinus: number[] = [];
   
   for (let i = 1; i < highs.length; i++) {
     const upMove = highs[i] - highs[i - 1];
@@ -497,10 +578,21 @@ function calculateADX(highs: number[], lows: number[], closes: number[], period:
     dmMinus.push(downMove > upMove && downMove > 0 ? downMove : 0);
   }
   
-  const adx = [];
-  for (let i = period - 1; i < dmPlus.length; i++) {
-    const avgDMPlus = dmPlus.slice(i - period + 1, i + 1).reduce((a, b) => a + b, 0) / period;
-    const avgDMMinus = dmMinus.slice(i - period + 1, i + 1).reduce((a, b) => a + b, 0) / period;
+  // Rolling +DM/-DM sums over the last `period` moves
+  const adx: number[] = [];
+  let dmPlusSum = 0;
+  let dmMinusSum = 0;
+  for (let i = 0; i < dmPlus.length; i++) {
+    dmPlusSum += dmPlus[i];
+    dmMinusSum += dmMinus[i];
+    if (i >= period) {
+      dmPlusSum -= dmPlus[i - period];
+      dmMinusSum -= dmMinus[i - period];
+    }
+    if (i < period - 1) continue;
+
+    const avgDMPlus = dmPlusSum / period;
+    const avgDMMinus = dmMinusSum / period;
     
     const sum = avgDMPlus + avgDMMinus;
     const adxValue = sum !== 0 ? Math.abs(avgDMPlus - avgDMMinus) / sum * 100 : 25;
@@ -559,9 +651,18 @@ function calculateSupportResistance(highs: number[], lows: number[], closes: num
     if (isLow) pivotLows.push(lows[i]);
   }
   
+  // Nearest pivot on each side of the price: a single min/max scan, no sort
   const currentPrice = closes[closes.length - 1];
-  const resistance = pivotHighs.filter(h => h > currentPrice).sort((a, b) => a - b)[0] || currentPrice * 1.05;
-  const support = pivotLows.filter(l => l < currentPrice).sort((a, b) => b - a)[0] || currentPrice * 0.95;
+  let nearestHigh = Infinity;
+  for (const h of pivotHighs) {
+    if (h > currentPrice && h < nearestHigh) nearestHigh = h;
+  }
+  let nearestLow = -Infinity;
+  for (const l of pivotLows) {
+    if (l < currentPrice && l > nearestLow) nearestLow = l;
+  }
+  const resistance = nearestHigh !== Infinity ? nearestHigh : currentPrice * 1.05;
+  const support = nearestLow !== -Infinity ? nearestLow : currentPrice * 0.95;
   
   return { support, resistance };
 }
@@ -602,7 +703,7 @@ function analyzeTrend(prices: number[], sma20: number[], sma50: number[], sma200
 // =================== PATTERN RECOGNITION ===================
 
 function detectPricePatterns(prices: number[], highs: number[], lows: number[]) {
-  console.log('🔍 Detecting price patterns...');
+  logDebug('🔍 Detecting price patterns...');
   
   const patterns = [];
   
@@ -775,7 +876,7 @@ function calculateTrendLine(values: number[]) {
 // =================== MARKET SENTIMENT ANALYSIS ===================
 
 function analyzeMarketSentiment(indicators: any, patterns: any[], dailyChange: number) {
-  console.log('🧠 Analyzing market sentiment...');
+  logDebug('🧠 Analyzing market sentiment...');
   
   let sentimentScore = 0;
   let regime = 'neutral';
@@ -818,11 +919,24 @@ function analyzeMarketSentiment(indicators: any, patterns: any[], dailyChange: n
 
 // =================== ADVANCED PREDICTION ENGINE ===================
 
+type ModelName = 'technical' | 'pattern' | 'momentum' | 'mean_reversion' | 'trend_following';
+
+const MODEL_NAMES: ModelName[] = ['technical', 'pattern', 'momentum', 'mean_reversion', 'trend_following'];
+
+const DEFAULT_MODEL_WEIGHTS: Record<ModelName, number> = {
+  technical: 0.3, pattern: 0.2, momentum: 0.2, mean_reversion: 0.15, trend_following: 0.15
+};
+
+const REGIME_MODEL_WEIGHTS: { [regime: string]: Record<ModelName, number> } = {
+  trending: { technical: 0.25, pattern: 0.15, momentum: 0.3, mean_reversion: 0.1, trend_following: 0.2 },
+  ranging: { technical: 0.2, pattern: 0.25, momentum: 0.15, mean_reversion: 0.3, trend_following: 0.1 },
+};
+
 function generateAdvancedPrediction(indicators: any, patterns: any[], sentiment: any, symbol: string) {
-  console.log('🤖 Generating advanced AI prediction...');
+  logDebug('🤖 Generating advanced AI prediction...');
   
   // Ensemble of different models
-  const models = {
+  const models: Record<ModelName, number> = {
     technical: calculateTechnicalScore(indicators),
     pattern: calculatePatternScore(patterns),
     momentum: calculateMomentumScore(indicators),
@@ -838,18 +952,10 @@ function generateAdvancedPrediction(indicators: any, patterns: any[], sentiment:
   };
   
   // Weight models based on market regime
-  let weights = { technical: 0.3, pattern: 0.2, momentum: 0.2, mean_reversion: 0.15, trend_following: 0.15 };
-  
-  if (sentiment.regime === 'trending') {
-    weights = { technical: 0.25, pattern: 0.15, momentum: 0.3, mean_reversion: 0.1, trend_following: 0.2 };
-  } else if (sentiment.regime === 'ranging') {
-    weights = { technical: 0.2, pattern: 0.25, momentum: 0.15, mean_reversion: 0.3, trend_following: 0.1 };
-  }
+  const weights = REGIME_MODEL_WEIGHTS[sentiment.regime] || DEFAULT_MODEL_WEIGHTS;
   
   // Calculate weighted ensemble score
-  const ensembleScore = Object.keys(models).reduce((sum, model) => {
-    return sum + models[model as keyof typeof models] * weights[model as keyof typeof weights];
-  }, 0);
+  const ensembleScore = MODEL_NAMES.reduce((sum, model) => sum + models[model] * weights[model], 0);
   
   // Calculate timeframe weighted score
   const timeframeScore = (timeframes.short_term * 0.5) + (timeframes.medium_term * 0.3) + (timeframes.long_term * 0.2);
@@ -1088,37 +1194,80 @@ function calculateMaxDrawdown(prices: number[]): number {
 // =================== UPDATED SIGNAL GENERATION ===================
 
 async function generateTradingSignals(symbols: string[]) {
-  console.log('🔄 Generating advanced trading signals...');
-  const signals = [];
+  logDebug('🔄 Generating advanced trading signals...');
+  const expiresAt = new Date(Date.now() + 8 * 60 * 60 * 1000).toISOString();
+
+  // One batched quote lookup for every symbol. The batch skips symbols it
+  // couldn't quote, so only those analyses fall back to their own lookup
+  const { data: quoteData } = await supabase.functions.invoke('yahoo-finance-data', {
+    body: { action: 'current_quotes', symbols }
+  });
+  const quotesBySymbol = new Map<string, any>();
+  for (const quote of quoteData?.quotes || []) {
+    quotesBySymbol.set(quote.symbol, quote);
+  }
 
-  for (const symbol of symbols) {
+  // Analyses are network-bound and independent, so run them concurrently
+  const analyses = await Promise.all(symbols.map(async (symbol) => {
     try {
-      const analysis = await analyzeStock(symbol);
-      const data = await analysis.json();
-      
-      if (data.prediction) {
-        signals.push({
-          symbol,
-          signal_type: data.prediction.signal,
-          target_price: data.prediction.targetPrice,
-          confidence_score: data.prediction.confidence,
-          risk_score: 1 - data.prediction.confidence,
-          reasoning: generateAdvancedReasoning(data.prediction, data.technicalIndicators, data.patterns),
-          expires_at: new Date(Date.now() + 8 * 60 * 60 * 1000).toISOString()
-        });
-      }
+      return await runAnalysis(symbol, quotesBySymbol.get(symbol));
     } catch (error) {
       console.error(`❌ Error analyzing ${symbol}:`, error);
+      return null;
     }
+  }));
+
+  const predictionRows: Record<string, unknown>[] = [];
+  const signals = [];
+  for (const analysis of analyses) {
+    if (!analysis) continue;
+    predictionRows.push(analysis.predictionRow);
+
+    // Simplified (insufficient data) predictions are stored but don't
+    // produce a trading signal
+    const { result } = analysis;
+    if (!('technicalIndicators' in result)) continue;
+    signals.push({
+      symbol: result.symbol,
+      signal_type: result.prediction.signal,
+      target_price: result.prediction.targetPrice,
+      confidence_score: result.prediction.confidence,
+      risk_score: 1 - result.prediction.confidence,
+      reasoning: generateAdvancedReasoning(result.prediction, result.technicalIndicators, result.prediction.patterns),
+      expires_at: expiresAt
+    });
   }
 
+  // One insert per table for the whole batch. A single rejected row fails
+  // the batched insert, so fall back to per-row inserts and only lose that
+  // symbol's prediction; signals are written either way.
+  const unstoredSymbols = new Set<unknown>();
+  if (predictionRows.length > 0) {
+    const { error: batchError } = await supabase.from('ai_predictions').insert(predictionRows);
+    if (batchError) {
+      console.error('❌ Batched prediction insert failed, retrying per row:', batchError);
+      await Promise.all(predictionRows.map(async (row) => {
+        const { error: insertError } = await supabase.from('ai_predictions').insert(row);
+        if (insertError) {
+          console.error(`❌ Error storing prediction for ${row.symbol}:`, insertError);
+          unstoredSymbols.add(row.symbol);
+        }
+      }));
+    }
+  }
   if (signals.length > 0) {
     await supabase.from('trading_signals').insert(signals);
   }
 
+  for (const signal of signals) {
+    if (!unstoredSymbols.has(signal.symbol)) {
+      logAnalysisCompleted(signal.symbol, signal.signal_type, signal.confidence_score);
+    }
+  }
+
   return new Response(
     JSON.stringify({ signals }),
-    { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+    { headers: jsonHeaders }
   );
 }
 
@@ -1165,13 +1314,13 @@ function generateAdvancedReasoning(prediction: any, indicators: any, patterns: a
 }
 
 async function scanOpportunities() {
-  console.log('🔍 Scanning market opportunities...');
+  logDebug('🔍 Scanning market opportunities...');
   
   // This could be enhanced to scan multiple stocks and find the best opportunities
   const opportunities = [];
   
   return new Response(
     JSON.stringify({ opportunities }),
-    { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+    { headers: jsonHeaders }
   );
 }
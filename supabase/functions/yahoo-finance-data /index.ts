@@ -6,6 +6,8 @@ const corsHeaders = {
   'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 };
 
+const jsonHeaders = { ...corsHeaders, 'Content-Type': 'application/json' };
+
 interface YahooQuoteResponse {
   chart: {
     result: [{
@@ -29,28 +31,127 @@ interface YahooQuoteResponse {
   };
 }
 
+interface Quote {
+  symbol: string;
+  price: number;
+  previousClose: number;
+  change: number;
+  changePercent: number;
+  volume: number;
+  timestamp: number;
+  open: number;
+  high: number;
+  low: number;
+}
+
+interface HistoricalBar {
+  timestamp: number;
+  date: string;
+  open: number;
+  high: number;
+  low: number;
+  close: number;
+  volume: number;
+}
+
 const supabase = createClient(
   Deno.env.get('SUPABASE_URL') ?? '',
-  Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? ''
+  Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? '',
+  {
+    // Service-role client: no user session to persist or refresh
+    auth: { persistSession: false, autoRefreshToken: false },
+  }
 );
 
+// Per-isolate response cache: warm isolates answer repeat lookups without
+// another round-trip to Yahoo
+const QUOTE_CACHE_TTL_MS = 30 * 1000;
+const HISTORY_CACHE_TTL_MS = 5 * 60 * 1000;
+const MARKET_SUMMARY_CACHE_TTL_MS = 60 * 1000;
+const SEARCH_CACHE_TTL_MS = 60 * 60 * 1000;
+
+// Bounded LRU: Map iteration order is insertion order, so re-inserting on
+// access keeps the least recently used entry first in line for eviction
+const CACHE_MAX_ENTRIES = 512;
+
+const cache = new Map<string, { expiresAt: number; value: unknown }>();
+
+function getCached<T>(key: string): T | undefined {
+  const entry = cache.get(key);
+  if (!entry) return undefined;
+  cache.delete(key);
+  if (entry.expiresAt <= Date.now()) return undefined;
+  cache.set(key, entry);
+  return entry.value as T;
+}
+
+function setCached(key: string, value: unknown, ttlMs: number) {
+  cache.delete(key);
+  cache.set(key, { expiresAt: Date.now() + ttlMs, value });
+  for (const oldestKey of cache.keys()) {
+    if (cache.size <= CACHE_MAX_ENTRIES) break;
+    cache.delete(oldestKey);
+  }
+}
+
+// Tickers, indices and FX pairs (AAPL, BRK-B, ^GSPC, EURUSD=X); anything else
+// is rejected before it costs a Yahoo round-trip
+const SYMBOL_PATTERN = /^[A-Z0-9.^=-]{1,12}$/i;
+const MAX_SEARCH_QUERY_LENGTH = 64;
+
+// History lookback in days per supported period, and the bar intervals Yahoo's
+// chart endpoint accepts; both go into the URL and the cache key
+const PERIOD_DAYS: { [key: string]: number } = {
+  '1d': 1,
+  '5d': 5,
+  '1mo': 30,
+  '3mo': 90,
+  '6mo': 180,
+  '1y': 365,
+  '2y': 730,
+  '5y': 1825,
+};
+const HISTORY_INTERVALS = new Set(['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo']);
+
+function isValidSymbolList(symbols: unknown): symbols is string[] {
+  return Array.isArray(symbols) && symbols.length > 0 &&
+    symbols.every((symbol) => typeof symbol === 'string' && SYMBOL_PATTERN.test(symbol));
+}
+
+function badRequest(message: string) {
+  return new Response(
+    JSON.stringify({ error: message }),
+    { headers: jsonHeaders, status: 400 }
+  );
+}
+
 serve(async (req) => {
   if (req.method === 'OPTIONS') {
     return new Response(null, { headers: corsHeaders });
   }
 
   try {
-    const { action, symbols, period = '1d', interval = '1m' } = await req.json();
+    const { action, symbols, query, period = '1d', interval = '1m' } = await req.json();
 
     switch (action) {
       case 'current_quotes':
+        if (!isValidSymbolList(symbols)) return badRequest('Invalid symbols');
         return await getCurrentQuotes(symbols);
       case 'historical_data':
+        if (!isValidSymbolList(symbols)) return badRequest('Invalid symbols');
+        if (!Object.hasOwn(PERIOD_DAYS, period) || !HISTORY_INTERVALS.has(interval)) {
+          return badRequest('Invalid period or interval');
+        }
         return await getHistoricalData(symbols[0], period, interval);
       case 'market_summary':
         return await getMarketSummary();
-      case 'search_stocks':
-        return await searchStocks(symbols[0]);
+      case 'search_stocks': {
+        const searchQuery = typeof query === 'string' ? query.trim() : symbols?.[0];
+        if (typeof searchQuery !== 'string' || !searchQuery || searchQuery.length > MAX_SEARCH_QUERY_LENGTH) {
+          return badRequest('Invalid search query');
+        }
+        return await searchStocks(searchQuery);
+      }
       default:
         throw new Error('Invalid action');
     }
@@ -58,76 +159,124 @@ serve(async (req) => {
     console.error('Error in yahoo-finance-data function:', error);
     return new Response(
       JSON.stringify({ error: error.message }),
-      { headers: { ...corsHeaders, 'Content-Type': 'application/json' }, status: 500 }
+      { headers: jsonHeaders, status: 500 }
     );
   }
 });
 
-async function getCurrentQuotes(symbols: string[]) {
-  const quotes = await Promise.all(
+async function getCurrentQuotes(requestedSymbols: string[]) {
+  // Repeated symbols would be fetched twice and collide in the batched upsert
+  const symbols = [...new Set(requestedSymbols)];
+  const fetched: Quote[] = [];
+  // One unknown symbol shouldn't fail the whole batch: keep the quotes that
+  // resolved and leave the missing symbols out of the response
+  const results = await Promise.allSettled(
     symbols.map(async (symbol) => {
-      const url = `https://query1.finance.yahoo.com/v8/finance/chart/${symbol}`;
-      const response = await fetch(url);
-      const data: YahooQuoteResponse = await response.json();
-      
-      if (!data.chart.result?.[0]) {
-        throw new Error(`No data found for symbol: ${symbol}`);
-      }
+      const cacheKey = `quote:${symbol}`;
+      const cached = getCached<Quote>(cacheKey);
+      if (cached) return cached;
 
-      const result = data.chart.result[0];
-      const meta = result.meta;
-      const lastTimestamp = result.timestamp[result.timestamp.length - 1];
-      const quotes = result.indicators.quote[0];
-      const lastIndex = quotes.close.length - 1;
-
-      return {
-        symbol,
-        price: meta.regularMarketPrice || quotes.close[lastIndex],
-        previousClose: meta.previousClose,
-        change: (meta.regularMarketPrice || quotes.close[lastIndex]) - meta.previousClose,
-        changePercent: ((meta.regularMarketPrice || quotes.close[lastIndex]) - meta.previousClose) / meta.previousClose * 100,
-        volume: quotes.volume[lastIndex],
-        timestamp: lastTimestamp,
-        open: quotes.open[lastIndex],
-        high: quotes.high[lastIndex],
-        low: quotes.low[lastIndex],
-      };
+      const quote = await fetchQuote(symbol);
+      setCached(cacheKey, quote, QUOTE_CACHE_TTL_MS);
+      fetched.push(quote);
+      return quote;
     })
   );
 
-  // Store in database
-  for (const quote of quotes) {
-    await supabase.from('stock_prices').upsert({
+  const quotes: Quote[] = [];
+  results.forEach((result, index) => {
+    if (result.status === 'fulfilled') {
+      quotes.push(result.value);
+    } else {
+      console.error(`Error fetching quote for ${symbols[index]}:`, result.reason);
+    }
+  });
+
+  // Store freshly fetched quotes (single batched upsert) without holding the
+  // response; waitUntil keeps the isolate alive until the write settles
+  if (fetched.length > 0) {
+    storeQuotes(fetched);
+  }
+
+  return new Response(
+    JSON.stringify({ quotes }),
+    { headers: jsonHeaders }
+  );
+}
+
+function storeQuotes(quotes: Quote[]) {
+  const date = new Date().toISOString().split('T')[0];
+  // Postgres rejects an upsert that touches the same (symbol, date) twice
+  const latestBySymbol = new Map<string, Quote>();
+  for (const quote of quotes) latestBySymbol.set(quote.symbol, quote);
+
+  const stored = supabase.from('stock_prices').upsert(
+    [...latestBySymbol.values()].map((quote) => ({
       symbol: quote.symbol,
-      date: new Date().toISOString().split('T')[0],
+      date,
       open_price: quote.open,
       high_price: quote.high,
       low_price: quote.low,
       close_price: quote.price,
       volume: quote.volume,
       adjusted_close: quote.price,
-    }, { onConflict: 'symbol,date' });
+    })),
+    { onConflict: 'symbol,date' }
+  ).then(({ error }) => {
+    if (error) console.error('Error storing quotes:', error);
+  });
+  // EdgeRuntime only exists on Supabase's runtime; elsewhere the write still
+  // runs and logs its error, it just isn't kept alive past the response
+  (globalThis as any).EdgeRuntime?.waitUntil?.(stored);
+}
+
+async function fetchQuote(symbol: string): Promise<Quote> {
+  const url = `https://query1.finance.yahoo.com/v8/finance/chart/${symbol}`;
+  const response = await fetch(url);
+  const data: YahooQuoteResponse = await response.json();
+  
+  if (!data.chart.result?.[0]) {
+    throw new Error(`No data found for symbol: ${symbol}`);
   }
 
-  return new Response(
-    JSON.stringify({ quotes }),
-    { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-  );
+  const result = data.chart.result[0];
+  const meta = result.meta;
+  const lastTimestamp = result.timestamp[result.timestamp.length - 1];
+  const quotes = result.indicators.quote[0];
+  const lastIndex = quotes.close.length - 1;
+  const price = meta.regularMarketPrice || quotes.close[lastIndex];
+  const change = price - meta.previousClose;
+
+  return {
+    symbol,
+    price,
+    previousClose: meta.previousClose,
+    change,
+    changePercent: change / meta.previousClose * 100,
+    volume: quotes.volume[lastIndex],
+    timestamp: lastTimestamp,
+    open: quotes.open[lastIndex],
+    high: quotes.high[lastIndex],
+    low: quotes.low[lastIndex],
+  };
 }
 
 async function getHistoricalData(symbol: string, period: string, interval: string) {
-  const periodMap: { [key: string]: number } = {
-    '1d': 1,
-    '5d': 5,
-    '1mo': 30,
-    '3mo': 90,
-    '6mo': 180,
-    '1y': 365,
-    '2y': 730,
-    '5y': 1825,
-  };
+  const cacheKey = `history:${symbol}:${period}:${interval}`;
+  let historicalData = getCached<HistoricalBar[]>(cacheKey);
+  if (!historicalData) {
+    historicalData = await fetchHistoricalBars(symbol, period, interval);
+    setCached(cacheKey, historicalData, HISTORY_CACHE_TTL_MS);
+  }
 
-  const days = periodMap[period] || 30;
+  return new Response(
+    JSON.stringify({ symbol, data: historicalData }),
+    { headers: jsonHeaders }
+  );
+}
+
+async function fetchHistoricalBars(symbol: string, period: string, interval: string): Promise<HistoricalBar[]> {
+  const days = PERIOD_DAYS[period];
   const endTime = Math.floor(Date.now() / 1000);
   const startTime = endTime - (days * 24 * 60 * 60);
 
@@ -143,30 +292,52 @@ async function getHistoricalData(symbol: string, period: string, interval: strin
   const timestamps = result.timestamp;
   const quotes = result.indicators.quote[0];
 
-  const historicalData = timestamps.map((timestamp, index) => ({
-    timestamp,
-    date: new Date(timestamp * 1000).toISOString(),
-    open: quotes.open[index],
-    high: quotes.high[index],
-    low: quotes.low[index],
-    close: quotes.close[index],
-    volume: quotes.volume[index],
-  })).filter(item => item.open && item.high && item.low && item.close);
+  // Single pass: drop incomplete bars before building/formatting them
+  const historicalData: HistoricalBar[] = [];
+  for (let index = 0; index < timestamps.length; index++) {
+    const open = quotes.open[index];
+    const high = quotes.high[index];
+    const low = quotes.low[index];
+    const close = quotes.close[index];
+    if (!open || !high || !low || !close) continue;
+
+    const timestamp = timestamps[index];
+    historicalData.push({
+      timestamp,
+      date: new Date(timestamp * 1000).toISOString(),
+      open,
+      high,
+      low,
+      close,
+      volume: quotes.volume[index],
+    });
+  }
+
+  return historicalData;
+}
+
+async function getMarketSummary() {
+  const cacheKey = 'market_summary';
+  let marketData = getCached<unknown[]>(cacheKey);
+  if (!marketData) {
+    marketData = await fetchMarketSummary();
+    setCached(cacheKey, marketData, MARKET_SUMMARY_CACHE_TTL_MS);
+  }
 
   return new Response(
-    JSON.stringify({ symbol, data: historicalData }),
-    { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+    JSON.stringify({ marketData }),
+    { headers: jsonHeaders }
   );
 }
 
-async function getMarketSummary() {
+async function fetchMarketSummary() {
   const marketSymbols = ['^GSPC', '^DJI', '^IXIC', 'SPY', 'QQQ', 'IWM'];
   const url = `https://query1.finance.yahoo.com/v7/finance/quote?symbols=${marketSymbols.join(',')}`;
   
   const response = await fetch(url);
   const data = await response.json();
 
-  const marketData = data.quoteResponse.result.map((quote: any) => ({
+  return data.quoteResponse.result.map((quote: any) => ({
     symbol: quote.symbol,
     name: quote.longName || quote.shortName,
     price: quote.regularMarketPrice,
@@ -175,27 +346,32 @@ async function getMarketSummary() {
     volume: quote.regularMarketVolume,
     marketCap: quote.marketCap,
   }));
+}
+
+async function searchStocks(query: string) {
+  // Search results only change when listings do; key on the normalized query
+  const cacheKey = `search:${query.trim().toUpperCase()}`;
+  let results = getCached<unknown[]>(cacheKey);
+  if (!results) {
+    results = await fetchSearchResults(query);
+    setCached(cacheKey, results, SEARCH_CACHE_TTL_MS);
+  }
 
   return new Response(
-    JSON.stringify({ marketData }),
-    { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+    JSON.stringify({ results }),
+    { headers: jsonHeaders }
   );
 }
 
-async function searchStocks(query: string) {
+async function fetchSearchResults(query: string) {
   const url = `https://query2.finance.yahoo.com/v1/finance/search?q=${encodeURIComponent(query)}`;
   const response = await fetch(url);
   const data = await response.json();
 
-  const results = data.quotes.slice(0, 10).map((quote: any) => ({
+  return data.quotes.slice(0, 10).map((quote: any) => ({
     symbol: quote.symbol,
     name: quote.longname || quote.shortname,
     exchange: quote.exchange,
     type: quote.typeDisp,
   }));
-
-  return new Response(
-    JSON.stringify({ results }),
-    { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-  );
 }
@@ -0,0 +1,8 @@
+-- Indexes matching the hot read paths
+-- Predictions feed: ORDER BY created_at DESC LIMIT n
+CREATE INDEX IF NOT EXISTS idx_ai_predictions_created_at ON public.ai_predictions(created_at DESC);
+
+-- UNIQUE(symbol, date) already provides this index; the duplicate only slows down quote upserts
+DROP INDEX IF EXISTS public.idx_stock_prices_symbol_date;
+
+ANALYZE public.ai_predictions;